@@ -5,6 +5,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from db_routing import RoutingSession, REPLICA_BIND_KEY, replica_status_command
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -12,7 +13,7 @@ logging.basicConfig(level=logging.DEBUG)
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
 login_manager = LoginManager()
 
 # create the app
@@ -27,6 +28,27 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_pre_ping": True,
 }
 
+# Optional read replica for the read-only analytics routes
+if os.environ.get("REPLICA_DATABASE_URL"):
+    app.config["SQLALCHEMY_BINDS"] = {
+        REPLICA_BIND_KEY: {
+            "url": os.environ["REPLICA_DATABASE_URL"],
+            "pool_recycle": 300,
+            "pool_pre_ping": True,
+        }
+    }
+app.config["REPLICA_MAX_LAG_SECONDS"] = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", 10))
+# Raised at runtime to at least REPLICA_MAX_LAG_SECONDS + REPLICA_CHECK_SECONDS
+app.config["REPLICA_STICKY_SECONDS"] = float(os.environ.get("REPLICA_STICKY_SECONDS", 15))
+app.config["REPLICA_CHECK_SECONDS"] = float(os.environ.get("REPLICA_CHECK_SECONDS", 5))
+app.config["REPLICA_RETRY_SECONDS"] = float(os.environ.get("REPLICA_RETRY_SECONDS", 30))
+app.cli.add_command(replica_status_command)
+
+# Comma-separated usernames allowed to use the admin endpoints
+app.config["ADMIN_USERNAMES"] = {
+    name.strip() for name in os.environ.get("ADMIN_USERNAMES", "").split(",") if name.strip()
+}
+
 # initialize extensions
 db.init_app(app)
 login_manager.init_app(app)
@@ -47,6 +69,10 @@ with app.app_context():
     # Create all database tables
     db.create_all()
     
+    # Full-text index over the question bank
+    from question_search import ensure_search_index
+    ensure_search_index()
+    
     # Seed initial questions if database is empty
     from utils import seed_questions
     seed_questions()
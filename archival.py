@@ -0,0 +1,180 @@
+from app import app, db
+from models import Interview, AnswerArchive
+from sqlalchemy import text
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime, timedelta
+import click
+import json
+import os
+import zlib
+
+# Interviews completed longer ago than this have their answer texts archived
+ANSWER_ARCHIVE_DAYS = int(os.environ.get("ANSWER_ARCHIVE_DAYS", 180))
+
+# Length of the answer summary kept in the hot table
+SUMMARY_LENGTH = 200
+
+def summarize_answer(user_answer):
+    """Shorten an answer to the summary kept in the hot table."""
+    if len(user_answer) <= SUMMARY_LENGTH:
+        return user_answer
+    return user_answer[:SUMMARY_LENGTH].rstrip() + '…'
+
+def compress_answers(answers):
+    payload = {
+        str(answer.id): {'user_answer': answer.user_answer, 'feedback': answer.feedback}
+        for answer in answers
+    }
+    return zlib.compress(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+def decompress_answers(payload):
+    """Return {answer_id: {'user_answer': ..., 'feedback': ...}} from an archive payload."""
+    return {
+        int(answer_id): texts
+        for answer_id, texts in json.loads(zlib.decompress(payload).decode('utf-8')).items()
+    }
+
+def archive_interview(interview):
+    """Move an interview's answer texts to the cold table, keeping scores and summaries hot."""
+    if interview.archive is not None or not interview.answers:
+        return False
+    
+    db.session.add(AnswerArchive(interview_id=interview.id,
+                                 payload=compress_answers(interview.answers),
+                                 answer_count=len(interview.answers)))
+    for answer in interview.answers:
+        answer.user_answer = summarize_answer(answer.user_answer)
+        answer.feedback = None
+    return True
+
+def archive_old_answers(days=ANSWER_ARCHIVE_DAYS, batch_size=500):
+    """Archive answers of interviews completed more than `days` ago, in batches."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    archived = 0
+    while True:
+        interviews = Interview.query.outerjoin(
+            AnswerArchive, AnswerArchive.interview_id == Interview.id
+        ).filter(
+            Interview.completed.is_(True),
+            Interview.completed_at < cutoff,
+            AnswerArchive.interview_id.is_(None)
+        ).order_by(Interview.id).limit(batch_size).all()
+        if not interviews:
+            break
+        
+        for interview in interviews:
+            if not archive_interview(interview):
+                # Nothing to archive; record an empty archive so it is not revisited
+                db.session.add(AnswerArchive(interview_id=interview.id,
+                                             payload=compress_answers([]), answer_count=0))
+            else:
+                archived += 1
+        db.session.commit()
+    return archived
+
+def rehydrate_interview(interview):
+    """Restore full answer texts of an archived interview onto its loaded answers.
+    
+    Values are set as already-committed state, so the hot table keeps its
+    summaries and nothing is written back on the next flush.
+    """
+    archive = interview.archive
+    if archive is None:
+        return interview
+    
+    texts = decompress_answers(archive.payload)
+    for answer in interview.answers:
+        archived = texts.get(answer.id)
+        if archived is not None:
+            set_committed_value(answer, 'user_answer', archived['user_answer'])
+            set_committed_value(answer, 'feedback', archived['feedback'])
+    return interview
+
+def partition_answers_table(months_ahead=3):
+    """Convert `answers` into a PostgreSQL table range-partitioned by month of answered_at.
+    
+    Only hot answers benefit from the smaller per-partition indexes, so this is
+    meant to be run once after archival is in place. Other databases are left as-is.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        raise click.ClickException('Answer partitioning is only supported on PostgreSQL.')
+    
+    is_partitioned = db.session.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'answers')"
+    )).scalar()
+    if not is_partitioned:
+        statements = [
+            "ALTER TABLE answers RENAME TO answers_unpartitioned",
+            "CREATE TABLE answers (LIKE answers_unpartitioned INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (answered_at)",
+            "ALTER TABLE answers ADD PRIMARY KEY (id, answered_at)",
+            "ALTER TABLE answers ADD FOREIGN KEY (interview_id) REFERENCES interviews (id)",
+            "ALTER TABLE answers ADD FOREIGN KEY (question_id) REFERENCES questions (id)",
+            "CREATE INDEX ix_answers_interview_id ON answers (interview_id)",
+            "CREATE TABLE answers_default PARTITION OF answers DEFAULT",
+        ]
+        for statement in statements:
+            db.session.execute(text(statement))
+        
+        oldest = db.session.execute(text("SELECT min(answered_at) FROM answers_unpartitioned")).scalar()
+        _create_monthly_partitions(oldest or datetime.utcnow(), months_ahead)
+        
+        db.session.execute(text(
+            "UPDATE answers_unpartitioned SET answered_at = now() WHERE answered_at IS NULL"
+        ))
+        db.session.execute(text("INSERT INTO answers SELECT * FROM answers_unpartitioned"))
+        db.session.execute(text("ALTER SEQUENCE answers_id_seq OWNED BY answers.id"))
+        db.session.execute(text("DROP TABLE answers_unpartitioned"))
+    else:
+        # Cover any months whose rows fell into the default partition since the last run
+        overflow = db.session.execute(text("SELECT min(answered_at) FROM answers_default")).scalar()
+        now = datetime.utcnow()
+        _create_monthly_partitions(min(overflow, now) if overflow else now, months_ahead)
+    
+    db.session.commit()
+
+def _create_monthly_partitions(start, months_ahead):
+    month = datetime(start.year, start.month, 1)
+    now = datetime.utcnow()
+    end = datetime(now.year, now.month, 1)
+    for _ in range(months_ahead):
+        end = (end + timedelta(days=32)).replace(day=1)
+    
+    while month <= end:
+        following = (month + timedelta(days=32)).replace(day=1)
+        name = f"answers_{month:%Y_%m}"
+        exists = db.session.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar()
+        if exists is None:
+            # Rows for this month may already sit in the default partition, and
+            # PostgreSQL refuses to add an overlapping partition while they do.
+            # Move them into a detached table first, then attach it.
+            bounds = {'start': month, 'end': following}
+            db.session.execute(text(f"CREATE TABLE {name} (LIKE answers INCLUDING DEFAULTS)"))
+            db.session.execute(text(
+                f"WITH moved AS (DELETE FROM answers_default "
+                f"WHERE answered_at >= :start AND answered_at < :end RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ), bounds)
+            db.session.execute(text(
+                f"ALTER TABLE answers ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')"
+            ))
+        month = following
+
+@app.cli.command('archive-answers')
+@click.option('--days', default=ANSWER_ARCHIVE_DAYS, show_default=True,
+              help='Archive interviews completed more than this many days ago.')
+@click.option('--batch-size', default=500, show_default=True)
+def archive_answers_command(days, batch_size):
+    """Move old answer texts to the compressed cold table."""
+    archived = archive_old_answers(days, batch_size)
+    print(f"Archived answers of {archived} interviews.")
+
+@app.cli.command('partition-answers')
+@click.option('--months-ahead', default=3, show_default=True,
+              help='Number of future monthly partitions to create.')
+def partition_answers_command(months_ahead):
+    """Range-partition the answers table by month (PostgreSQL only); safe to rerun."""
+    partition_answers_table(months_ahead)
+    print("Answer partitions are up to date.")
@@ -0,0 +1,151 @@
+from flask import current_app, g, session
+from flask.cli import with_appcontext
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from functools import wraps
+import click
+import logging
+import threading
+import time
+
+REPLICA_BIND_KEY = 'replica'
+
+# Seconds of replication lag reported by PostgreSQL standbys. A standby that is
+# streaming and has replayed everything it received is current, however long ago
+# the last transaction was. Without a streaming WAL receiver, receive and replay
+# positions match even while the standby falls behind, so the age of the last
+# replayed transaction is used instead (NULL if nothing was replayed yet).
+PG_LAG_QUERY = (
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+# Per-process replica health, refreshed at most every REPLICA_CHECK_SECONDS
+_replica_state = {'checked_at': 0.0, 'usable': False, 'retry_after': 0.0}
+_state_lock = threading.Lock()
+
+class ReplicaMiss(Exception):
+    """Raised by a replica route when the data it needs has not reached the replica."""
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica engine while a replica route is running."""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and g.get('use_replica')
+                and not self._flushing and not (self.new or self.dirty or self.deleted)):
+            return self._db.engines[REPLICA_BIND_KEY]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _replica_lag(engine):
+    with engine.connect() as connection:
+        if engine.dialect.name == 'postgresql':
+            lag = connection.execute(text(PG_LAG_QUERY)).scalar()
+            # Unknown lag counts as too much
+            return float('inf') if lag is None else float(lag)
+        # Other backends have no lag to report; just confirm the replica answers
+        connection.execute(text("SELECT 1"))
+        return 0.0
+
+def _mark_replica_failed():
+    with _state_lock:
+        _replica_state['usable'] = False
+        _replica_state['retry_after'] = time.monotonic() + current_app.config['REPLICA_RETRY_SECONDS']
+
+def _replica_usable():
+    now = time.monotonic()
+    with _state_lock:
+        if now < _replica_state['retry_after']:
+            return False
+        if now - _replica_state['checked_at'] < current_app.config['REPLICA_CHECK_SECONDS']:
+            return _replica_state['usable']
+    
+    db = current_app.extensions['sqlalchemy']
+    try:
+        lag = _replica_lag(db.engines[REPLICA_BIND_KEY])
+    except DBAPIError:
+        logging.warning("Read replica unreachable; using the primary.", exc_info=True)
+        _mark_replica_failed()
+        return False
+    
+    usable = lag <= current_app.config['REPLICA_MAX_LAG_SECONDS']
+    if not usable:
+        logging.warning(f"Read replica is {lag:.1f}s behind; using the primary.")
+    with _state_lock:
+        _replica_state['checked_at'] = now
+        _replica_state['usable'] = usable
+    return usable
+
+def stick_to_primary():
+    """Route this user's replica reads to the primary for a few seconds (read-your-writes).
+    
+    The window never ends before a replica that counts as healthy must have
+    replayed the write: the maximum tolerated lag plus one health-check interval.
+    """
+    config = current_app.config
+    sticky = max(config['REPLICA_STICKY_SECONDS'],
+                 config['REPLICA_MAX_LAG_SECONDS'] + config['REPLICA_CHECK_SECONDS'])
+    session['primary_until'] = time.time() + sticky
+
+def retry_on_primary():
+    """Abandon the replica for this request when it is missing data the view expects."""
+    if g.get('use_replica'):
+        raise ReplicaMiss()
+
+def replica_route(view):
+    """Run a read-only view against the read replica when one is configured and healthy.
+    
+    Falls back to the primary when the replica lags, errors, or the user has
+    just written data that must be visible to them.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if (REPLICA_BIND_KEY not in current_app.config.get('SQLALCHEMY_BINDS', {})
+                or session.get('primary_until', 0) > time.time()
+                or not _replica_usable()):
+            return view(*args, **kwargs)
+        
+        db = current_app.extensions['sqlalchemy']
+        g.use_replica = True
+        try:
+            return view(*args, **kwargs)
+        except ReplicaMiss:
+            db.session.rollback()
+            g.use_replica = False
+            return view(*args, **kwargs)
+        except DBAPIError:
+            logging.warning("Read replica query failed; retrying on the primary.", exc_info=True)
+            _mark_replica_failed()
+            db.session.rollback()
+            g.use_replica = False
+            return view(*args, **kwargs)
+        finally:
+            g.use_replica = False
+    return wrapped
+
+@click.command('replica-status')
+@with_appcontext
+def replica_status_command():
+    """Report the read replica's lag and whether replica routes would use it."""
+    if REPLICA_BIND_KEY not in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        print("No read replica configured (set REPLICA_DATABASE_URL).")
+        return
+    
+    db = current_app.extensions['sqlalchemy']
+    for name, engine in (('primary', db.engines[None]), ('replica', db.engines[REPLICA_BIND_KEY])):
+        try:
+            with engine.connect() as connection:
+                interviews = connection.execute(text("SELECT count(*) FROM interviews")).scalar()
+            print(f"{name}: {engine.url.render_as_string(hide_password=True)} ({interviews} interviews)")
+        except DBAPIError as error:
+            print(f"{name}: {engine.url.render_as_string(hide_password=True)} unreachable: {error.orig}")
+    
+    try:
+        print(f"replica lag: {_replica_lag(db.engines[REPLICA_BIND_KEY]):.1f}s "
+              f"(max {current_app.config['REPLICA_MAX_LAG_SECONDS']:.1f}s)")
+    except DBAPIError:
+        pass
+    print(f"replica routes use: {'replica' if _replica_usable() else 'primary'}")
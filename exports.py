@@ -0,0 +1,106 @@
+from app import db
+from models import User, Question, Interview, Answer, AnswerArchive
+from archival import decompress_answers
+import csv
+import io
+import json
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+# Approximate size of each chunk written to the response
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Leading characters that make spreadsheet applications treat a cell as a formula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+EXPORT_COLUMNS = [
+    'username', 'interview_id', 'role', 'interview_score', 'completed_at',
+    'question_id', 'question_text', 'user_answer', 'answer_score', 'feedback', 'answered_at'
+]
+
+def _export_rows(user_id=None):
+    """Yield flat export rows, streaming from the database in batches.
+    
+    Plain column tuples are selected so no ORM objects or lazy relationships
+    are loaded; yield_per makes PostgreSQL use a server-side cursor.
+    """
+    query = db.session.query(
+        User.username, Interview.id, Interview.role, Interview.total_score, Interview.completed_at,
+        Question.id, Question.question_text, Answer.user_answer, Answer.score, Answer.feedback,
+        Answer.answered_at, Answer.id, AnswerArchive.interview_id
+    ).select_from(Interview).join(
+        User, User.id == Interview.user_id
+    ).join(
+        Answer, Answer.interview_id == Interview.id
+    ).join(
+        Question, Question.id == Answer.question_id
+    ).outerjoin(
+        AnswerArchive, AnswerArchive.interview_id == Interview.id
+    ).filter(Interview.completed.is_(True))
+    
+    if user_id is not None:
+        query = query.filter(Interview.user_id == user_id)
+    
+    query = query.order_by(Interview.id, Answer.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    
+    # Archived texts are fetched once per interview; rows arrive grouped by interview
+    archived_interview_id = None
+    archived_texts = {}
+    
+    for row in query:
+        *columns, answer_id, archive_id = row
+        values = dict(zip(EXPORT_COLUMNS, columns))
+        if archive_id is not None:
+            if archive_id != archived_interview_id:
+                archived_interview_id = archive_id
+                archived_texts = decompress_answers(db.session.get(AnswerArchive, archive_id).payload)
+            values.update(archived_texts.get(answer_id, {}))
+        for key in ('completed_at', 'answered_at'):
+            if values[key] is not None:
+                values[key] = values[key].isoformat()
+        yield values
+
+def _chunked(lines):
+    """Group small text pieces into chunks of roughly EXPORT_CHUNK_SIZE characters."""
+    pending = []
+    size = 0
+    for line in lines:
+        pending.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield ''.join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield ''.join(pending)
+
+def _csv_safe(value):
+    """Neutralize text a spreadsheet would otherwise evaluate as a formula."""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def _csv_lines(user_id):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    for values in _export_rows(user_id):
+        values = {key: _csv_safe(value) for key, value in values.items()}
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        yield buffer.getvalue()
+
+def generate_csv_export(user_id=None):
+    """Yield the export as CSV text chunks, starting with the header row."""
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS).writeheader()
+    # Send the header straight away so the first byte is not held back
+    yield buffer.getvalue()
+    yield from _chunked(_csv_lines(user_id))
+
+def generate_jsonl_export(user_id=None):
+    """Yield the export as JSON Lines text chunks, one answer per line."""
+    # An empty first chunk flushes the response headers before the query runs
+    yield ''
+    yield from _chunked(json.dumps(values, ensure_ascii=False) + '\n' for values in _export_rows(user_id))
@@ -46,6 +46,10 @@ class RoleSelectionForm(FlaskForm):
         ('devops_engineer', 'DevOps Engineer'),
         ('software_engineer', 'Software Engineer')
     ], validators=[DataRequired()])
+    mode = SelectField('Question Selection', choices=[
+        ('random', 'Random'),
+        ('adaptive', 'Focus on My Weak Areas')
+    ], default='random', validators=[DataRequired()])
     submit = SubmitField('Start Interview')
 
 class AnswerForm(FlaskForm):
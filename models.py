@@ -1,4 +1,5 @@
 from app import db
+from flask import current_app
 from flask_login import UserMixin
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -21,6 +22,10 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
     
+    @property
+    def is_admin(self):
+        return self.username in current_app.config.get('ADMIN_USERNAMES', ())
+    
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -80,3 +85,105 @@ class Answer(db.Model):
     
     def __repr__(self):
         return f'<Answer {self.id}: Score {self.score}>'
+
+class QuestionStat(db.Model):
+    __tablename__ = 'question_stats'
+    
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), primary_key=True)
+    role = db.Column(db.String(100), nullable=False, index=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    skips = db.Column(db.Integer, default=0, nullable=False)
+    mean_score = db.Column(db.Float, default=0.0, nullable=False)
+    m2 = db.Column(db.Float, default=0.0, nullable=False)  # Sum of squared deviations (Welford)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    question = db.relationship('Question', backref=db.backref('stats', uselist=False), lazy=True)
+    
+    @property
+    def score_variance(self):
+        if not self.attempts or self.attempts < 2:
+            return 0.0
+        return self.m2 / (self.attempts - 1)
+    
+    @property
+    def skip_rate(self):
+        if not self.attempts:
+            return 0.0
+        return self.skips / self.attempts
+    
+    def __repr__(self):
+        return f'<QuestionStat {self.question_id}: {self.attempts} attempts>'
+
+class UserQuestionStat(db.Model):
+    __tablename__ = 'user_question_stats'
+    __table_args__ = (
+        db.Index('ix_user_question_stats_user_role', 'user_id', 'role'),
+    )
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), primary_key=True)
+    role = db.Column(db.String(100), nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    mean_score = db.Column(db.Float, default=0.0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def weakness(self):
+        return max(0.0, 100 - self.mean_score)
+    
+    def __repr__(self):
+        return f'<UserQuestionStat {self.user_id}/{self.question_id}: {self.mean_score}>'
+
+class RoleScoreHistogram(db.Model):
+    __tablename__ = 'role_score_histograms'
+    
+    role = db.Column(db.String(100), primary_key=True)
+    bins = db.Column(db.Text, nullable=False)  # JSON list of counts, one bin per whole score point
+    total_count = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<RoleScoreHistogram {self.role}: {self.total_count} scores>'
+
+class LeaderboardEntry(db.Model):
+    __tablename__ = 'leaderboard_entries'
+    __table_args__ = (
+        db.Index('ix_leaderboard_entries_role_score', 'role', 'best_score'),
+    )
+    
+    role = db.Column(db.String(100), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    interview_id = db.Column(db.Integer, db.ForeignKey('interviews.id'), nullable=False)
+    best_score = db.Column(db.Float, default=0.0, nullable=False)
+    achieved_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    user = db.relationship('User', lazy=True)
+    
+    def __repr__(self):
+        return f'<LeaderboardEntry {self.role}/{self.user_id}: {self.best_score}>'
+
+class AnswerArchive(db.Model):
+    __tablename__ = 'answer_archives'
+    
+    interview_id = db.Column(db.Integer, db.ForeignKey('interviews.id'), primary_key=True)
+    payload = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed JSON of full answer texts
+    answer_count = db.Column(db.Integer, default=0, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    interview = db.relationship('Interview', backref=db.backref('archive', uselist=False, cascade='all, delete-orphan'), lazy=True)
+    
+    def __repr__(self):
+        return f'<AnswerArchive {self.interview_id}: {self.answer_count} answers>'
+
+class QuestionBand(db.Model):
+    __tablename__ = 'question_bands'
+    
+    band = db.Column(db.SmallInteger, primary_key=True)
+    bucket = db.Column(db.BigInteger, primary_key=True)  # Hash of one LSH band of the MinHash signature
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), primary_key=True, index=True)
+    
+    def __repr__(self):
+        return f'<QuestionBand {self.band}/{self.bucket}: {self.question_id}>'
@@ -0,0 +1,174 @@
+from app import app, db
+from models import User, Interview, RoleScoreHistogram, LeaderboardEntry
+from utils import insert_missing_rows
+from sqlalchemy import func
+import json
+import threading
+import time
+
+# One histogram bin per whole score point, 0-100 inclusive
+HISTOGRAM_BINS = 101
+
+# Number of leaderboard entries served per role, and kept by compaction
+LEADERBOARD_SIZE = 10
+LEADERBOARD_RETAIN = 1000
+
+# Per-process cache of role -> _RoleSnapshot
+SNAPSHOT_TTL_SECONDS = 60
+
+_snapshots = {}
+_snapshot_lock = threading.Lock()
+
+def _score_bin(score):
+    return min(HISTOGRAM_BINS - 1, max(0, int(round(score or 0))))
+
+class _RoleSnapshot:
+    """Prefix sums over a role's histogram plus its cached leaderboard."""
+    
+    def __init__(self, bins, leaderboard):
+        self.bins = bins
+        self.below = [0] * HISTOGRAM_BINS  # Number of scores strictly below each bin
+        running = 0
+        for i, count in enumerate(bins):
+            self.below[i] = running
+            running += count
+        self.total = running
+        self.leaderboard = leaderboard
+        self.loaded_at = time.monotonic()
+    
+    def percentile(self, score):
+        if not self.total:
+            return None
+        i = _score_bin(score)
+        # Midpoint percentile rank: ties count as half above, half below
+        return round(100 * (self.below[i] + 0.5 * self.bins[i]) / self.total)
+
+def _load_bins(histogram):
+    if histogram is None or not histogram.bins:
+        return [0] * HISTOGRAM_BINS
+    bins = json.loads(histogram.bins)
+    return bins + [0] * (HISTOGRAM_BINS - len(bins))
+
+def _load_snapshot(role):
+    histogram = db.session.get(RoleScoreHistogram, role)
+    entries = db.session.query(
+        User.username, LeaderboardEntry.user_id, LeaderboardEntry.best_score
+    ).join(User, User.id == LeaderboardEntry.user_id).filter(
+        LeaderboardEntry.role == role
+    ).order_by(
+        LeaderboardEntry.best_score.desc(), LeaderboardEntry.achieved_at
+    ).limit(LEADERBOARD_SIZE).all()
+    leaderboard = [
+        {'username': username, 'user_id': user_id, 'score': best_score}
+        for username, user_id, best_score in entries
+    ]
+    return _RoleSnapshot(_load_bins(histogram), leaderboard)
+
+def _get_snapshot(role):
+    with _snapshot_lock:
+        snapshot = _snapshots.get(role)
+    if snapshot is None or time.monotonic() - snapshot.loaded_at >= SNAPSHOT_TTL_SECONDS:
+        snapshot = _load_snapshot(role)
+        with _snapshot_lock:
+            _snapshots[role] = snapshot
+    return snapshot
+
+def get_role_percentile(role, score):
+    """Return the percentile rank of a score among completed interviews for a role."""
+    return _get_snapshot(role).percentile(score)
+
+def get_leaderboard(role, limit=LEADERBOARD_SIZE):
+    """Return the top users for a role by their best interview score."""
+    return _get_snapshot(role).leaderboard[:limit]
+
+def record_interview_score(interview):
+    """Add a completed interview's score to its role histogram and leaderboard."""
+    # Create missing rows first so concurrent first completions lock instead of colliding
+    insert_missing_rows(RoleScoreHistogram, [
+        {'role': interview.role, 'bins': json.dumps([0] * HISTOGRAM_BINS), 'total_count': 0}
+    ])
+    insert_missing_rows(LeaderboardEntry, [
+        {'role': interview.role, 'user_id': interview.user_id, 'interview_id': interview.id,
+         'best_score': interview.total_score, 'achieved_at': interview.completed_at}
+    ])
+    
+    histogram = RoleScoreHistogram.query.filter_by(role=interview.role).with_for_update().one()
+    bins = _load_bins(histogram)
+    bins[_score_bin(interview.total_score)] += 1
+    histogram.bins = json.dumps(bins)
+    histogram.total_count = (histogram.total_count or 0) + 1
+    
+    entry = LeaderboardEntry.query.filter_by(
+        role=interview.role, user_id=interview.user_id
+    ).with_for_update().one()
+    if interview.total_score > entry.best_score:
+        entry.interview_id = interview.id
+        entry.best_score = interview.total_score
+        entry.achieved_at = interview.completed_at
+
+def refresh_role_snapshot(role):
+    """Drop this process's cached snapshot after a new score is committed."""
+    with _snapshot_lock:
+        _snapshots.pop(role, None)
+
+def compact_role_statistics(rebuild=False):
+    """Trim leaderboards to LEADERBOARD_RETAIN entries per role.
+    
+    With rebuild=True the histograms are recomputed from completed interviews,
+    which corrects any drift and backfills interviews completed before the
+    histograms existed.
+    """
+    if rebuild:
+        bins_by_role = {}
+        # Group on the raw score and bin in Python so rounding matches the live path
+        rows = db.session.query(
+            Interview.role, Interview.total_score, func.count(Interview.id)
+        ).filter_by(completed=True).group_by(
+            Interview.role, Interview.total_score
+        ).all()
+        for role, score, count in rows:
+            bins_by_role.setdefault(role, [0] * HISTOGRAM_BINS)[_score_bin(score)] += count
+        
+        RoleScoreHistogram.query.delete()
+        for role, bins in bins_by_role.items():
+            db.session.add(RoleScoreHistogram(role=role, bins=json.dumps(bins), total_count=sum(bins)))
+        
+        LeaderboardEntry.query.delete()
+        best = db.session.query(
+            Interview.role, Interview.user_id, func.max(Interview.total_score)
+        ).filter_by(completed=True).group_by(
+            Interview.role, Interview.user_id
+        ).all()
+        for role, user_id, best_score in best:
+            interview = Interview.query.filter_by(
+                role=role, user_id=user_id, completed=True, total_score=best_score
+            ).order_by(Interview.completed_at).first()
+            db.session.add(LeaderboardEntry(role=role, user_id=user_id, interview_id=interview.id,
+                                            best_score=best_score, achieved_at=interview.completed_at))
+    
+    for (role,) in db.session.query(LeaderboardEntry.role).distinct().all():
+        cutoff = LeaderboardEntry.query.filter_by(role=role).order_by(
+            LeaderboardEntry.best_score.desc()
+        ).offset(LEADERBOARD_RETAIN - 1).first()
+        if cutoff is not None:
+            # Entries tied with the last retained score are kept
+            LeaderboardEntry.query.filter(
+                LeaderboardEntry.role == role,
+                LeaderboardEntry.best_score < cutoff.best_score
+            ).delete(synchronize_session=False)
+    
+    db.session.commit()
+    with _snapshot_lock:
+        _snapshots.clear()
+
+@app.cli.command('compact-percentiles')
+def compact_percentiles_command():
+    """Compact role leaderboards; run periodically (e.g. from cron)."""
+    compact_role_statistics()
+    print("Role statistics compacted.")
+
+@app.cli.command('rebuild-percentiles')
+def rebuild_percentiles_command():
+    """Rebuild role histograms and leaderboards from completed interviews."""
+    compact_role_statistics(rebuild=True)
+    print("Role statistics rebuilt.")
@@ -0,0 +1,259 @@
+from app import app, db
+from models import Question, QuestionBand
+from question_stats import invalidate_weighted_indexes
+from sqlalchemy import event, inspect, text, tuple_
+from array import array
+import click
+import hashlib
+import json
+import logging
+import random
+import re
+
+# Expression indexed by the PostgreSQL GIN index; queries must repeat it verbatim
+PG_SEARCH_VECTOR = "to_tsvector('english', question_text || ' ' || model_answer)"
+
+SQLITE_FTS_STATEMENTS = [
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN "
+    "INSERT INTO questions_fts(rowid, question_text, model_answer) "
+    "VALUES (new.id, new.question_text, new.model_answer); END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN "
+    "INSERT INTO questions_fts(questions_fts, rowid, question_text, model_answer) "
+    "VALUES ('delete', old.id, old.question_text, old.model_answer); END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE ON questions BEGIN "
+    "INSERT INTO questions_fts(questions_fts, rowid, question_text, model_answer) "
+    "VALUES ('delete', old.id, old.question_text, old.model_answer); "
+    "INSERT INTO questions_fts(rowid, question_text, model_answer) "
+    "VALUES (new.id, new.question_text, new.model_answer); END",
+]
+
+# MinHash parameters: NUM_BANDS * ROWS_PER_BAND permutations over character shingles
+NUM_BANDS = 32
+ROWS_PER_BAND = 4
+NUM_PERMUTATIONS = NUM_BANDS * ROWS_PER_BAND
+SHINGLE_SIZE = 4
+DUPLICATE_THRESHOLD = 0.8
+
+_rng = random.Random(1729)  # Fixed seed so stored band hashes stay valid across processes
+_PERMUTATION_MASKS = [_rng.getrandbits(64) for _ in range(NUM_PERMUTATIONS)]
+_EMPTY_SIGNATURE = array('Q', [(1 << 64) - 1] * NUM_PERMUTATIONS)
+
+_search_backend = None
+
+def ensure_search_index():
+    """Create the full-text index for the question bank if the database supports one."""
+    global _search_backend
+    dialect = db.engine.dialect.name
+    
+    if dialect == 'postgresql':
+        db.session.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_questions_search ON questions USING GIN ({PG_SEARCH_VECTOR})"
+        ))
+        db.session.commit()
+        _search_backend = 'postgresql'
+    elif dialect == 'sqlite':
+        try:
+            exists = db.session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'questions_fts'"
+            )).first()
+            if not exists:
+                db.session.execute(text(
+                    "CREATE VIRTUAL TABLE questions_fts USING fts5("
+                    "question_text, model_answer, content='questions', content_rowid='id', "
+                    "tokenize='porter unicode61')"
+                ))
+                # Index any questions that predate the virtual table
+                db.session.execute(text("INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')"))
+            for statement in SQLITE_FTS_STATEMENTS:
+                db.session.execute(text(statement))
+            db.session.commit()
+            _search_backend = 'sqlite'
+        except Exception:
+            db.session.rollback()
+            logging.warning("SQLite FTS5 is unavailable; question search will scan the table.")
+            _search_backend = None
+
+def search_questions(query, role=None, limit=20):
+    """Return questions matching a free-text query, best matches first."""
+    terms = re.findall(r'\w+', query.lower())
+    if not terms:
+        return []
+    
+    if _search_backend == 'postgresql':
+        sql = (
+            f"SELECT id FROM questions, websearch_to_tsquery('english', :query) AS q "
+            f"WHERE {PG_SEARCH_VECTOR} @@ q"
+            + (" AND role = :role" if role else "")
+            + f" ORDER BY ts_rank({PG_SEARCH_VECTOR}, q) DESC LIMIT :limit"
+        )
+        params = {'query': query, 'role': role, 'limit': limit}
+    elif _search_backend == 'sqlite':
+        # Quote every term so user input cannot inject FTS5 syntax; the last one matches as a prefix
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        sql = (
+            "SELECT questions.id FROM questions_fts JOIN questions ON questions.id = questions_fts.rowid "
+            "WHERE questions_fts MATCH :match"
+            + (" AND questions.role = :role" if role else "")
+            + " ORDER BY questions_fts.rank LIMIT :limit"
+        )
+        params = {'match': match, 'role': role, 'limit': limit}
+    else:
+        filters = [Question.question_text.ilike(f'%{term}%') | Question.model_answer.ilike(f'%{term}%')
+                   for term in terms]
+        scan = Question.query.filter(*filters)
+        if role:
+            scan = scan.filter_by(role=role)
+        return scan.order_by(Question.id).limit(limit).all()
+    
+    ids = [row[0] for row in db.session.execute(text(sql), params)]
+    questions = {question.id: question for question in Question.query.filter(Question.id.in_(ids)).all()}
+    return [questions[question_id] for question_id in ids if question_id in questions]
+
+def shingles(value):
+    """Return the character shingles of a text, ignoring case, punctuation and spacing."""
+    normalized = ' '.join(re.findall(r'\w+', value.lower()))
+    if not normalized:
+        return set()
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(max(1, len(normalized) - SHINGLE_SIZE + 1))}
+
+def jaccard(first, second):
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+def minhash_signature(shingle_set):
+    """Return the MinHash signature of a set of shingles."""
+    if not shingle_set:
+        return _EMPTY_SIGNATURE
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for shingle in shingle_set
+    ]
+    # XOR with a random mask acts as one hash permutation per signature slot
+    return array('Q', [min(map(mask.__xor__, hashes)) for mask in _PERMUTATION_MASKS])
+
+def band_keys(signature):
+    """Return the (band, bucket) LSH keys of a signature, one per band."""
+    keys = []
+    for band in range(NUM_BANDS):
+        start = band * ROWS_PER_BAND
+        digest = hashlib.blake2b(signature[start:start + ROWS_PER_BAND].tobytes(), digest_size=8).digest()
+        # Keep the bucket within a signed 64-bit column
+        keys.append((band, int.from_bytes(digest, 'big') & ((1 << 63) - 1)))
+    return keys
+
+def _store_bands(connection, question_id, question_text):
+    table = QuestionBand.__table__
+    connection.execute(table.delete().where(table.c.question_id == question_id))
+    connection.execute(table.insert(), [
+        {'band': band, 'bucket': bucket, 'question_id': question_id}
+        for band, bucket in band_keys(minhash_signature(shingles(question_text)))
+    ])
+
+@event.listens_for(Question, 'after_insert')
+def _bands_after_insert(mapper, connection, question):
+    _store_bands(connection, question.id, question.question_text)
+
+@event.listens_for(Question, 'after_update')
+def _bands_after_update(mapper, connection, question):
+    if inspect(question).attrs.question_text.history.has_changes():
+        _store_bands(connection, question.id, question.question_text)
+
+@event.listens_for(Question, 'before_delete')
+def _bands_before_delete(mapper, connection, question):
+    table = QuestionBand.__table__
+    connection.execute(table.delete().where(table.c.question_id == question.id))
+
+def index_question_bands(batch_size=1000):
+    """Store LSH bands for questions that have none, e.g. written with raw SQL.
+    
+    Returns the number of questions indexed. Run from the CLI, never per request.
+    """
+    indexed = 0
+    while True:
+        missing = db.session.query(Question.id, Question.question_text).outerjoin(
+            QuestionBand, QuestionBand.question_id == Question.id
+        ).filter(QuestionBand.question_id.is_(None)).order_by(Question.id).limit(batch_size).all()
+        if not missing:
+            return indexed
+        connection = db.session.connection()
+        for question_id, question_text in missing:
+            _store_bands(connection, question_id, question_text)
+        db.session.commit()
+        indexed += len(missing)
+
+def find_near_duplicates(question_text, threshold=DUPLICATE_THRESHOLD, exclude_id=None):
+    """Return [(question, similarity)] for questions whose text nearly duplicates question_text.
+    
+    Candidates sharing an LSH band are looked up in question_bands with one
+    indexed query; similarity is the exact Jaccard of the character shingles
+    of the current question texts.
+    """
+    shingle_set = shingles(question_text)
+    keys = band_keys(minhash_signature(shingle_set))
+    candidate_ids = {
+        question_id for (question_id,) in db.session.query(QuestionBand.question_id).filter(
+            tuple_(QuestionBand.band, QuestionBand.bucket).in_(keys)
+        ).distinct()
+    }
+    candidate_ids.discard(exclude_id)
+    if not candidate_ids:
+        return []
+    
+    matches = []
+    for question in Question.query.filter(Question.id.in_(candidate_ids)).all():
+        similarity = jaccard(shingle_set, shingles(question.question_text))
+        if similarity >= threshold:
+            matches.append((question, similarity))
+    return sorted(matches, key=lambda match: match[1], reverse=True)
+
+def import_questions(rows, threshold=DUPLICATE_THRESHOLD, skip_duplicates=True, batch_size=500):
+    """Bulk-insert question dicts, skipping near-duplicates of the bank and of each other.
+    
+    Returns (imported_count, skipped) where skipped lists (row, duplicate_question_id).
+    """
+    imported = 0
+    skipped = []
+    roles = set()
+    
+    for row in rows:
+        if skip_duplicates:
+            duplicates = find_near_duplicates(row['question_text'], threshold)
+            if duplicates:
+                skipped.append((row, duplicates[0][0].id))
+                continue
+        
+        question = Question(**row)
+        db.session.add(question)
+        # Flushing writes its bands, so later rows in the same file are checked against it
+        db.session.flush()
+        roles.add(question.role)
+        imported += 1
+        if imported % batch_size == 0:
+            db.session.commit()
+    
+    db.session.commit()
+    for role in roles:
+        invalidate_weighted_indexes(role)
+    return imported, skipped
+
+@app.cli.command('import-questions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', default=DUPLICATE_THRESHOLD, show_default=True,
+              help='Jaccard similarity of character shingles at which a question counts as a duplicate.')
+@click.option('--allow-duplicates', is_flag=True, help='Import near-duplicates as well.')
+def import_questions_command(path, threshold, allow_duplicates):
+    """Import questions from a JSON Lines file, one question object per line."""
+    with open(path, encoding='utf-8') as handle:
+        rows = (json.loads(line) for line in handle if line.strip())
+        imported, skipped = import_questions(rows, threshold, not allow_duplicates)
+    
+    for row, duplicate_id in skipped:
+        print(f"Skipped near-duplicate of question {duplicate_id}: {row['question_text'][:80]}")
+    print(f"Imported {imported} questions, skipped {len(skipped)}.")
+
+@app.cli.command('index-question-bands')
+def index_question_bands_command():
+    """Store near-duplicate LSH bands for questions that lack them."""
+    indexed = index_question_bands()
+    print(f"Indexed {indexed} questions.")
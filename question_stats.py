@@ -0,0 +1,216 @@
+from app import db
+from models import Question, QuestionStat, UserQuestionStat
+from utils import SKIPPED_ANSWER, insert_missing_rows
+import random
+import threading
+import time
+
+# Weakness assumed for questions nobody has attempted yet
+DEFAULT_WEAKNESS = 50.0
+
+# Per-process cache of role -> weighted index over global question weights.
+# One index per role bounds memory by the size of the question bank; users'
+# own weaknesses are applied as temporary overrides while sampling.
+INDEX_TTL_SECONDS = 900
+
+_index_cache = {}
+_index_lock = threading.Lock()
+
+class WeightedIndex:
+    """Fenwick tree over question weights with O(log n) updates and weighted draws."""
+    
+    def __init__(self, weighted_ids):
+        self.ids = [question_id for question_id, _ in weighted_ids]
+        self.positions = {question_id: i for i, question_id in enumerate(self.ids)}
+        self.weights = [float(weight) for _, weight in weighted_ids]
+        self.tree = [0.0] * (len(self.ids) + 1)
+        self.built_at = time.monotonic()
+        
+        # Linear-time Fenwick construction
+        for i, weight in enumerate(self.weights, start=1):
+            self.tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= len(self.ids):
+                self.tree[parent] += self.tree[i]
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def _add(self, position, delta):
+        i = position + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+    
+    def total(self):
+        total = 0.0
+        i = len(self.ids)
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+    
+    def update(self, question_id, weight):
+        position = self.positions.get(question_id)
+        if position is None:
+            return False
+        self._add(position, weight - self.weights[position])
+        self.weights[position] = weight
+        return True
+    
+    def _find(self, target):
+        """Return the position whose cumulative weight range contains target."""
+        position = 0
+        step = 1 << (len(self.ids).bit_length())
+        while step:
+            nxt = position + step
+            if nxt <= len(self.ids) and self.tree[nxt] <= target:
+                position = nxt
+                target -= self.tree[nxt]
+            step >>= 1
+        return min(position, len(self.ids) - 1)
+    
+    def sample(self, k, rng=random):
+        """Draw k distinct question ids proportionally to their weights."""
+        drawn = []
+        try:
+            while len(drawn) < min(k, len(self.ids)):
+                total = self.total()
+                if total <= 0:
+                    break
+                position = self._find(rng.random() * total)
+                drawn.append((position, self.weights[position]))
+                self._add(position, -self.weights[position])
+                self.weights[position] = 0.0
+        finally:
+            # Restore the weights removed while sampling without replacement
+            for position, weight in drawn:
+                self._add(position, weight)
+                self.weights[position] = weight
+        return [self.ids[position] for position, _ in drawn]
+
+def question_weight(question_stat, user_stat):
+    """Selection weight of a question for a user; weaker areas weigh more."""
+    if user_stat is not None and user_stat.attempts:
+        weakness = user_stat.weakness
+    elif question_stat is not None and question_stat.attempts:
+        weakness = max(0.0, 100 - question_stat.mean_score)
+    else:
+        weakness = DEFAULT_WEAKNESS
+    return 1.0 + weakness
+
+def _build_index(role):
+    rows = db.session.query(Question.id, QuestionStat).outerjoin(
+        QuestionStat, QuestionStat.question_id == Question.id
+    ).filter(Question.role == role).order_by(Question.id).all()
+    
+    return WeightedIndex([
+        (question_id, question_weight(question_stat, None))
+        for question_id, question_stat in rows
+    ])
+
+def get_weighted_index(role):
+    """Return the cached weighted index for a role, building it if needed."""
+    with _index_lock:
+        index = _index_cache.get(role)
+        if index is not None and time.monotonic() - index.built_at < INDEX_TTL_SECONDS:
+            return index
+    
+    index = _build_index(role)
+    with _index_lock:
+        _index_cache[role] = index
+    return index
+
+def invalidate_weighted_indexes(role=None):
+    """Drop cached indexes, e.g. after questions are added to a role."""
+    with _index_lock:
+        if role is None:
+            _index_cache.clear()
+        else:
+            _index_cache.pop(role, None)
+
+def select_adaptive_questions(user_id, role, count=5):
+    """Pick question ids for a new interview, weighted toward the user's weak areas.
+    
+    Only the questions the user has attempted are reweighted, so the work is
+    O((k + count) log n) for k attempted questions in a bank of n.
+    """
+    index = get_weighted_index(role)
+    user_stats = UserQuestionStat.query.filter_by(user_id=user_id, role=role).all()
+    
+    with _index_lock:
+        global_weights = {}
+        try:
+            for user_stat in user_stats:
+                position = index.positions.get(user_stat.question_id)
+                if position is None:
+                    continue
+                global_weights[user_stat.question_id] = index.weights[position]
+                index.update(user_stat.question_id, question_weight(None, user_stat))
+            return index.sample(count)
+        finally:
+            for question_id, weight in global_weights.items():
+                index.update(question_id, weight)
+
+def record_interview_stats(interview):
+    """Fold a completed interview's answers into the per-question and per-user aggregates."""
+    answers = interview.answers
+    if not answers:
+        return
+    
+    question_ids = sorted({answer.question_id for answer in answers})
+    
+    # Create missing aggregate rows first so every row can be locked below
+    insert_missing_rows(QuestionStat, [
+        {'question_id': question_id, 'role': interview.role}
+        for question_id in question_ids
+    ])
+    insert_missing_rows(UserQuestionStat, [
+        {'user_id': interview.user_id, 'question_id': question_id, 'role': interview.role}
+        for question_id in question_ids
+    ])
+    
+    question_stats = {
+        stat.question_id: stat
+        for stat in QuestionStat.query.filter(
+            QuestionStat.question_id.in_(question_ids)
+        ).order_by(QuestionStat.question_id).with_for_update().all()
+    }
+    user_stats = {
+        stat.question_id: stat
+        for stat in UserQuestionStat.query.filter(
+            UserQuestionStat.user_id == interview.user_id,
+            UserQuestionStat.question_id.in_(question_ids)
+        ).order_by(UserQuestionStat.question_id).with_for_update().all()
+    }
+    
+    for answer in answers:
+        score = answer.score or 0.0
+        
+        # Welford's online update for mean and variance
+        question_stat = question_stats[answer.question_id]
+        question_stat.attempts += 1
+        delta = score - question_stat.mean_score
+        question_stat.mean_score += delta / question_stat.attempts
+        question_stat.m2 += delta * (score - question_stat.mean_score)
+        if answer.user_answer == SKIPPED_ANSWER:
+            question_stat.skips += 1
+        
+        user_stat = user_stats[answer.question_id]
+        user_stat.attempts += 1
+        user_stat.mean_score += (score - user_stat.mean_score) / user_stat.attempts
+
+def refresh_weighted_index(interview):
+    """Bring this process's cached role index in step with committed aggregates."""
+    with _index_lock:
+        if interview.role not in _index_cache:
+            return
+    
+    question_ids = {answer.question_id for answer in interview.answers}
+    question_stats = QuestionStat.query.filter(QuestionStat.question_id.in_(question_ids)).all()
+    
+    with _index_lock:
+        index = _index_cache.get(interview.role)
+        if index is not None:
+            for question_stat in question_stats:
+                index.update(question_stat.question_id, question_weight(question_stat, None))
@@ -1,12 +1,38 @@
-from flask import render_template, redirect, url_for, flash, request, session
+from flask import render_template, redirect, url_for, flash, request, session, Response, stream_with_context, abort, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from app import app, db
 from models import User, Question, Interview, Answer
 from forms import RegistrationForm, LoginForm, RoleSelectionForm, AnswerForm
-from utils import calculate_feedback, get_performance_insights
+from utils import calculate_feedback, get_performance_insights, ordinal, SKIPPED_ANSWER
+from question_stats import select_adaptive_questions, record_interview_stats, refresh_weighted_index
+from percentiles import record_interview_score, refresh_role_snapshot, get_role_percentile, get_leaderboard
+from exports import generate_csv_export, generate_jsonl_export
+from archival import rehydrate_interview
+from question_search import search_questions, find_near_duplicates, DUPLICATE_THRESHOLD
+from functools import wraps
+from db_routing import replica_route, stick_to_primary, retry_on_primary
 from datetime import datetime
 import random
 
+app.add_template_filter(ordinal)
+
+def admin_required(view):
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if not current_user.is_admin:
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapped
+
+def _question_summary(question):
+    return {
+        'id': question.id,
+        'role': question.role,
+        'question_text': question.question_text,
+        'difficulty_level': question.difficulty_level
+    }
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -53,6 +79,7 @@ def logout():
 
 @app.route('/dashboard')
 @login_required
+@replica_route
 def dashboard():
     form = RoleSelectionForm()
     recent_interviews = Interview.query.filter_by(
@@ -80,14 +107,18 @@ def start_interview():
     if form.validate_on_submit():
         role = form.role.data
         
-        # Get random questions for the selected role
-        questions = Question.query.filter_by(role=role).all()
-        if len(questions) < 5:
+        if form.mode.data == 'adaptive':
+            # Weighted draw toward the user's weak areas
+            selected_question_ids = select_adaptive_questions(current_user.id, role, 5)
+        else:
+            # Get random questions for the selected role
+            question_ids = [q.id for q in Question.query.with_entities(Question.id).filter_by(role=role).all()]
+            selected_question_ids = random.sample(question_ids, min(5, len(question_ids)))
+        
+        if len(selected_question_ids) < 5:
             flash(f'Not enough questions available for {role}. Please contact administrator.', 'error')
             return redirect(url_for('dashboard'))
         
-        selected_questions = random.sample(questions, min(5, len(questions)))
-        
         # Create new interview
         interview = Interview(user_id=current_user.id, role=role)
         db.session.add(interview)
@@ -95,7 +126,7 @@ def start_interview():
         
         # Store interview and questions in session
         session['current_interview_id'] = interview.id
-        session['interview_questions'] = [q.id for q in selected_questions]
+        session['interview_questions'] = selected_question_ids
         session['current_question_index'] = 0
         
         return redirect(url_for('interview'))
@@ -135,7 +166,7 @@ def interview():
         
         if is_skip or form.validate_on_submit():
             # Use skip message if skipping, otherwise use user's answer
-            user_answer = "Question skipped by user." if is_skip else form.answer.data
+            user_answer = SKIPPED_ANSWER if is_skip else form.answer.data
             
             # Save the answer
             answer = Answer(
@@ -183,13 +214,28 @@ def complete_interview():
     interview_id = session['current_interview_id']
     interview = Interview.query.get_or_404(interview_id)
     
-    # Mark interview as completed
-    interview.completed = True
-    interview.completed_at = datetime.utcnow()
-    interview.total_score = interview.calculate_total_score()
+    # Mark interview as completed; the conditional UPDATE lets only one of
+    # several concurrent requests (double submit, refresh) claim completion
+    claimed = Interview.query.filter_by(id=interview.id, completed=False).update(
+        {'completed': True, 'completed_at': datetime.utcnow()}, synchronize_session='fetch'
+    )
+    if claimed:
+        interview.total_score = interview.calculate_total_score()
+        
+        # Update per-question and per-user answer statistics
+        record_interview_stats(interview)
+        record_interview_score(interview)
     
     db.session.commit()
     
+    # Cached weights and snapshots only follow statistics that were actually saved
+    if claimed:
+        refresh_weighted_index(interview)
+        refresh_role_snapshot(interview.role)
+    
+    # Read the fresh results from the primary until the replica has caught up
+    stick_to_primary()
+    
     # Clear session data
     session.pop('current_interview_id', None)
     session.pop('interview_questions', None)
@@ -199,8 +245,14 @@ def complete_interview():
 
 @app.route('/results/<int:interview_id>')
 @login_required
+@replica_route
 def results(interview_id):
-    interview = Interview.query.get_or_404(interview_id)
+    interview = db.session.get(Interview, interview_id)
+    if interview is None or not interview.completed:
+        # A lagging replica may not have this interview, or its completion, yet
+        retry_on_primary()
+    if interview is None:
+        abort(404)
     
     # Verify interview belongs to current user
     if interview.user_id != current_user.id:
@@ -211,15 +263,25 @@ def results(interview_id):
         flash('Interview not completed yet.', 'error')
         return redirect(url_for('dashboard'))
     
+    # Bring back full answer texts if this interview has been archived
+    rehydrate_interview(interview)
+    
     # Get performance insights
     insights = get_performance_insights(interview)
     
+    # Role-level standing from the precomputed histograms
+    percentile = get_role_percentile(interview.role, interview.total_score)
+    leaderboard = get_leaderboard(interview.role)
+    
     return render_template('results.html', 
                          interview=interview, 
-                         insights=insights)
+                         insights=insights,
+                         percentile=percentile,
+                         leaderboard=leaderboard)
 
 @app.route('/interview_history')
 @login_required
+@replica_route
 def interview_history():
     interviews = Interview.query.filter_by(
         user_id=current_user.id, 
@@ -228,6 +290,51 @@ def interview_history():
     
     return render_template('interview_history.html', interviews=interviews)
 
+def _export_user_id():
+    # Admins may export every user's interviews with ?all=1
+    if request.args.get('all') == '1':
+        if not current_user.is_admin:
+            abort(403)
+        return None
+    return current_user.id
+
+@app.route('/export/interviews.csv')
+@login_required
+def export_interviews_csv():
+    user_id = _export_user_id()
+    return Response(stream_with_context(generate_csv_export(user_id)),
+                    mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=interviews.csv'})
+
+@app.route('/export/interviews.jsonl')
+@login_required
+def export_interviews_jsonl():
+    user_id = _export_user_id()
+    return Response(stream_with_context(generate_jsonl_export(user_id)),
+                    mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': 'attachment; filename=interviews.jsonl'})
+
+@app.route('/admin/questions/search')
+@admin_required
+def admin_question_search():
+    query = request.args.get('q', '')
+    role = request.args.get('role') or None
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    
+    questions = search_questions(query, role=role, limit=limit)
+    return jsonify(results=[_question_summary(question) for question in questions])
+
+@app.route('/admin/questions/<int:question_id>/duplicates')
+@admin_required
+def admin_question_duplicates(question_id):
+    question = Question.query.get_or_404(question_id)
+    threshold = request.args.get('threshold', DUPLICATE_THRESHOLD, type=float)
+    
+    duplicates = find_near_duplicates(question.question_text, threshold, exclude_id=question.id)
+    return jsonify(question=_question_summary(question),
+                   duplicates=[dict(_question_summary(duplicate), similarity=round(similarity, 3))
+                               for duplicate, similarity in duplicates])
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -1,7 +1,40 @@
 from app import db
 from models import Question
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 import re
 
+# Stored as the answer text when a user skips a question
+SKIPPED_ANSWER = "Question skipped by user."
+
+def insert_missing_rows(model, rows):
+    """Insert rows whose primary key does not exist yet.
+    
+    Concurrent writers inserting the same key are tolerated, so callers can
+    insert-then-lock aggregate rows instead of racing on creation.
+    """
+    if not rows:
+        return
+    dialect = db.session.get_bind(mapper=model).dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        db.session.execute(insert(model).values(rows).on_conflict_do_nothing())
+        return
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.add(model(**row))
+        except IntegrityError:
+            pass
+
+def ordinal(number):
+    """Format an integer with its English ordinal suffix, e.g. 1st, 12th, 22nd."""
+    if 10 <= number % 100 <= 20:
+        suffix = 'th'
+    else:
+        suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(number % 10, 'th')
+    return f'{number}{suffix}'
+
 def calculate_feedback(question, user_answer):
     """Calculate feedback and score based on keyword matching and answer quality."""
     if not user_answer or not user_answer.strip():